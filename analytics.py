@@ -0,0 +1,109 @@
+# 파생 지표 계산에 필요한 원본 칼럼
+REQUIRED_COLUMNS = ['brandNm', 'yr', 'frcsCnt', 'newFrcsRgsCnt', 'ctrtEndCnt', 'ctrtCncltnCnt', 'avrgSlsAmt']
+
+# 파생 지표 칼럼과 화면에 표시할 이름
+METRIC_COLUMNS = {
+    'frcsCntYoyChange': '가맹점수 전년 대비 증감',
+    'frcsCntYoyRate': '가맹점수 전년 대비 증가율',
+    'netOpenCnt': '순개점수 (신규 - 종료 - 해지)',
+    'churnRate': '이탈률 ((종료 + 해지) / 가맹점수)',
+    'avrgSlsAmtYoyRate': '점포당 평균매출 전년 대비 증가율',
+}
+
+
+def metrics_table_name(table_name):
+    """원본 테이블에 대응하는 파생 지표 테이블 이름을 반환합니다."""
+    return f"{table_name}_metrics"
+
+
+def build_franchise_metrics(conn, table_name):
+    """
+    브랜드·연도별 파생 지표를 SQLite 윈도 함수(LAG)로 계산하여 별도 테이블에 저장합니다.
+    필요한 칼럼이 없는 데이터셋이면 아무 작업도 하지 않고 None을, 성공하면 저장한 행 수를 반환합니다.
+    """
+    columns = [row[1] for row in conn.execute(f'PRAGMA table_info("{table_name}")')]
+    if not all(col in columns for col in REQUIRED_COLUMNS):
+        return None
+
+    metrics_table = metrics_table_name(table_name)
+    with conn:
+        conn.execute(f'DROP TABLE IF EXISTS "{metrics_table}"')
+        conn.execute(f'''
+            CREATE TABLE "{metrics_table}" (
+                brandNm TEXT NOT NULL,
+                yr INTEGER NOT NULL,
+                frcsCntYoyChange INTEGER,
+                frcsCntYoyRate REAL,
+                netOpenCnt INTEGER,
+                churnRate REAL,
+                avrgSlsAmtYoyRate REAL,
+                PRIMARY KEY (brandNm, yr)
+            )
+        ''')
+        # 같은 브랜드가 한 해에 여러 행이면 합산(매출은 평균)한 뒤,
+        # 브랜드별로 연도 순 직전 행과 비교합니다. 직전 행이 바로 전년도일 때만 증감을 계산합니다.
+        conn.execute(f'''
+            INSERT INTO "{metrics_table}"
+            WITH yearly AS (
+                SELECT
+                    brandNm,
+                    CAST(yr AS INTEGER) AS yr,
+                    SUM(frcsCnt) AS frcsCnt,
+                    SUM(newFrcsRgsCnt) AS newFrcsRgsCnt,
+                    SUM(ctrtEndCnt) AS ctrtEndCnt,
+                    SUM(ctrtCncltnCnt) AS ctrtCncltnCnt,
+                    AVG(avrgSlsAmt) AS avrgSlsAmt
+                FROM "{table_name}"
+                WHERE brandNm IS NOT NULL AND yr IS NOT NULL
+                GROUP BY brandNm, CAST(yr AS INTEGER)
+            ),
+            lagged AS (
+                SELECT
+                    *,
+                    LAG(yr) OVER w AS prevYr,
+                    LAG(frcsCnt) OVER w AS prevFrcsCnt,
+                    LAG(avrgSlsAmt) OVER w AS prevAvrgSlsAmt
+                FROM yearly
+                WINDOW w AS (PARTITION BY brandNm ORDER BY yr)
+            )
+            SELECT
+                brandNm,
+                yr,
+                CASE WHEN prevYr = yr - 1 THEN frcsCnt - prevFrcsCnt END,
+                CASE WHEN prevYr = yr - 1 AND prevFrcsCnt > 0
+                     THEN (frcsCnt - prevFrcsCnt) * 1.0 / prevFrcsCnt END,
+                newFrcsRgsCnt - ctrtEndCnt - ctrtCncltnCnt,
+                CASE WHEN frcsCnt > 0 THEN (ctrtEndCnt + ctrtCncltnCnt) * 1.0 / frcsCnt END,
+                CASE WHEN prevYr = yr - 1 AND prevAvrgSlsAmt > 0
+                     THEN (avrgSlsAmt - prevAvrgSlsAmt) * 1.0 / prevAvrgSlsAmt END
+            FROM lagged
+        ''')
+    return conn.execute(f'SELECT COUNT(*) FROM "{metrics_table}"').fetchone()[0]
+
+
+def available_metric_columns(conn, table_name, schema=None):
+    """
+    파생 지표 테이블이 있으면 그 지표 칼럼 목록을, 없으면 빈 리스트를 반환합니다.
+    schema를 주면 ATTACH된 DB에서 찾습니다.
+    """
+    master = f'{schema}.sqlite_master' if schema else 'sqlite_master'
+    row = conn.execute(
+        f"SELECT 1 FROM {master} WHERE type = 'table' AND name = ?",
+        (metrics_table_name(table_name),)
+    ).fetchone()
+    return list(METRIC_COLUMNS) if row else []
+
+
+def select_with_metrics_sql(conn, table_name, schema=None):
+    """원본 테이블의 모든 칼럼에 파생 지표 칼럼을 붙여 조회하는 SQL을 반환합니다."""
+    prefix = f'{schema}.' if schema else ''
+    metric_cols = available_metric_columns(conn, table_name, schema)
+    if not metric_cols:
+        return f'SELECT * FROM {prefix}"{table_name}"'
+
+    metrics_table = metrics_table_name(table_name)
+    metric_select = ", ".join(f'm."{col}"' for col in metric_cols)
+    return (
+        f'SELECT t.*, {metric_select} FROM {prefix}"{table_name}" AS t '
+        f'LEFT JOIN {prefix}"{metrics_table}" AS m ON m.brandNm = t.brandNm AND m.yr = t.yr'
+    )
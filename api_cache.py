@@ -0,0 +1,145 @@
+import gzip
+import hashlib
+import os
+import sqlite3
+import time
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+# API 원본 응답을 보관하는 캐시 디렉터리
+# (작업 폴더의 '*.db' 목록에 섞이지 않도록 하위 폴더에 둡니다.)
+CACHE_DIR = 'api_cache'
+OBJECTS_DIR = os.path.join(CACHE_DIR, 'objects')
+INDEX_PATH = os.path.join(CACHE_DIR, 'index.sqlite3')
+
+
+def normalize_endpoint(api_url):
+    """
+    API URL을 캐시 키로 쓸 엔드포인트 문자열로 바꿉니다.
+    서비스 키만 빼고 나머지 쿼리 파라미터는 정렬하여 남기므로, 조회 조건이 다른 URL은 캐시를 공유하지 않습니다.
+    """
+    parsed = urlparse(api_url)
+    endpoint = f"{parsed.scheme}://{parsed.netloc}{parsed.path}".rstrip('/')
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if key.lower() != 'servicekey'
+    )
+    return f"{endpoint}?{urlencode(query)}" if query else endpoint
+
+
+def _connect_index():
+    """캐시 인덱스 DB에 연결하고, 테이블이 없으면 생성합니다."""
+    os.makedirs(OBJECTS_DIR, exist_ok=True)
+    conn = sqlite3.connect(INDEX_PATH, timeout=30)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS pages (
+            endpoint TEXT NOT NULL,
+            yr INTEGER NOT NULL,
+            num_of_rows INTEGER NOT NULL,
+            page_no INTEGER NOT NULL,
+            content_hash TEXT NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            fetched_at REAL NOT NULL,
+            PRIMARY KEY (endpoint, yr, num_of_rows, page_no)
+        )
+    ''')
+    # 교체된 응답 파일을 지울 때 다른 페이지가 같은 내용을 참조하는지 빠르게 확인합니다.
+    conn.execute('CREATE INDEX IF NOT EXISTS pages_content_hash ON pages (content_hash)')
+    return conn
+
+
+def _object_path(content_hash):
+    return os.path.join(OBJECTS_DIR, content_hash[:2], f"{content_hash}.json.gz")
+
+
+def lookup(endpoint, year, page_no, num_of_rows):
+    """캐시에 저장된 페이지 정보를 반환합니다. 없으면 None을 반환합니다."""
+    conn = _connect_index()
+    try:
+        row = conn.execute(
+            'SELECT content_hash, etag, last_modified FROM pages '
+            'WHERE endpoint = ? AND yr = ? AND num_of_rows = ? AND page_no = ?',
+            (endpoint, year, num_of_rows, page_no)
+        ).fetchone()
+    finally:
+        conn.close()
+
+    if row is None or not os.path.exists(_object_path(row[0])):
+        return None
+    return {'content_hash': row[0], 'etag': row[1], 'last_modified': row[2]}
+
+
+def read_body(content_hash):
+    """해시에 해당하는 원본 응답(bytes)을 압축 해제하여 반환합니다."""
+    with gzip.open(_object_path(content_hash), 'rb') as f:
+        return f.read()
+
+
+def store(endpoint, year, page_no, num_of_rows, body, etag=None, last_modified=None):
+    """
+    원본 응답을 내용 해시(SHA-256) 기준으로 압축 저장하고 인덱스를 갱신합니다.
+    내용이 같은 응답은 한 번만 저장되며, 교체되어 더 이상 참조되지 않는 이전 응답 파일은 지웁니다.
+    """
+    content_hash = hashlib.sha256(body).hexdigest()
+    path = _object_path(content_hash)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with gzip.open(tmp_path, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+
+    conn = _connect_index()
+    try:
+        with conn:
+            old_row = conn.execute(
+                'SELECT content_hash FROM pages '
+                'WHERE endpoint = ? AND yr = ? AND num_of_rows = ? AND page_no = ?',
+                (endpoint, year, num_of_rows, page_no)
+            ).fetchone()
+            conn.execute(
+                'INSERT OR REPLACE INTO pages '
+                '(endpoint, yr, num_of_rows, page_no, content_hash, etag, last_modified, fetched_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (endpoint, year, num_of_rows, page_no, content_hash, etag, last_modified, time.time())
+            )
+            orphaned = old_row is not None and old_row[0] != content_hash and conn.execute(
+                'SELECT 1 FROM pages WHERE content_hash = ? LIMIT 1', (old_row[0],)
+            ).fetchone() is None
+    finally:
+        conn.close()
+
+    if orphaned:
+        try:
+            os.remove(_object_path(old_row[0]))
+        except FileNotFoundError:
+            pass
+    return content_hash
+
+
+def touch(endpoint, year, page_no, num_of_rows):
+    """조건부 요청 결과가 304(변경 없음)일 때 확인 시각만 갱신합니다."""
+    conn = _connect_index()
+    try:
+        with conn:
+            conn.execute(
+                'UPDATE pages SET fetched_at = ? '
+                'WHERE endpoint = ? AND yr = ? AND num_of_rows = ? AND page_no = ?',
+                (time.time(), endpoint, year, num_of_rows, page_no)
+            )
+    finally:
+        conn.close()
+
+
+def cached_page_size(endpoint, year):
+    """해당 연도의 첫 페이지가 가장 최근에 저장된 페이지 크기(numOfRows)를 반환합니다."""
+    conn = _connect_index()
+    try:
+        row = conn.execute(
+            'SELECT num_of_rows FROM pages WHERE endpoint = ? AND yr = ? AND page_no = 1 '
+            'ORDER BY fetched_at DESC LIMIT 1',
+            (endpoint, year)
+        ).fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else None
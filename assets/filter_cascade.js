@@ -0,0 +1,143 @@
+// 계층 필터(h-filter-0 ~ h-filter-4)의 연계 옵션을 브라우저에서 계산하는 clientside 콜백입니다.
+// 서버가 데이터셋 선택 시 한 번 보내 주는 'h-filter-hierarchy'(사전 인코딩된 필터 조합)를 사용합니다.
+// 조합이 너무 많아 hierarchy가 비어 있으면 'h-filter-request-N'에 요청을 적어 서버 측 검색으로 넘깁니다.
+(function () {
+    // search_index.py의 to_jamo / to_chosung과 같은 규칙으로 검색어를 풀어 씁니다.
+    const CHO = 'ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ';
+    const JUNG = 'ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ';
+    const JONG = ['', ...'ㄱㄲㄳㄴㄵㄶㄷㄹㄺㄻㄼㄽㄾㄿㅀㅁㅂㅄㅅㅆㅇㅈㅊㅋㅌㅍㅎ'];
+    // 겹받침·이중모음은 낱자로 나눕니다. (search_index.py의 _SPLIT_COMPOUND와 같은 표)
+    const SPLIT_COMPOUND = {
+        'ㄳ': 'ㄱㅅ', 'ㄵ': 'ㄴㅈ', 'ㄶ': 'ㄴㅎ', 'ㄺ': 'ㄹㄱ', 'ㄻ': 'ㄹㅁ', 'ㄼ': 'ㄹㅂ',
+        'ㄽ': 'ㄹㅅ', 'ㄾ': 'ㄹㅌ', 'ㄿ': 'ㄹㅍ', 'ㅀ': 'ㄹㅎ', 'ㅄ': 'ㅂㅅ',
+        'ㅘ': 'ㅗㅏ', 'ㅙ': 'ㅗㅐ', 'ㅚ': 'ㅗㅣ', 'ㅝ': 'ㅜㅓ', 'ㅞ': 'ㅜㅔ', 'ㅟ': 'ㅜㅣ', 'ㅢ': 'ㅡㅣ',
+    };
+
+    function toJamo(text) {
+        let out = '';
+        for (const ch of String(text).toLowerCase()) {
+            const code = ch.charCodeAt(0) - 0xAC00;
+            if (code >= 0 && code < 11172) {
+                out += CHO[Math.floor(code / 588)] + JUNG[Math.floor((code % 588) / 28)] + JONG[code % 28];
+            } else {
+                out += ch.normalize('NFD');
+            }
+        }
+        return [...out].map((ch) => SPLIT_COMPOUND[ch] || ch).join('');
+    }
+
+    function isChosungQuery(text) {
+        const stripped = text.replace(/ /g, '');
+        return stripped.length > 0 && [...stripped].every((ch) => CHO.includes(ch));
+    }
+
+    // callbacks.py의 _to_options와 같은 형태로 옵션을 만듭니다. (선택된 값은 항상 유지)
+    function toOptions(values, selected, search) {
+        const chosen = selected || [];
+        return chosen.concat(values.filter((v) => !chosen.includes(v))).map((v) => {
+            const option = {label: String(v), value: v};
+            if (search) {
+                option.search = `${v} ${search}`;
+            }
+            return option;
+        });
+    }
+
+    // parents[j]에 선택된 값들과 일치하는 조합에서 level 칼럼의 값을 찾아 검색어로 거릅니다.
+    function matchValues(hierarchy, level, parents, search) {
+        const dict = hierarchy.dicts[level];
+        const parentCodes = parents.map((vals, j) => {
+            if (!vals || !vals.length) {
+                return null;
+            }
+            const index = new Map(hierarchy.dicts[j].map((v, code) => [v, code]));
+            return new Set(vals.map((v) => index.get(v)));
+        });
+
+        const found = new Uint8Array(dict.length);
+        if (parentCodes.every((codes) => codes === null)) {
+            found.fill(1);
+        } else {
+            const codes = hierarchy.codes;
+            const rowCount = codes[level].length;
+            for (let r = 0; r < rowCount; r++) {
+                let ok = true;
+                for (let j = 0; j < parentCodes.length; j++) {
+                    if (parentCodes[j] !== null && !parentCodes[j].has(codes[j][r])) {
+                        ok = false;
+                        break;
+                    }
+                }
+                if (ok && codes[level][r] >= 0) {
+                    found[codes[level][r]] = 1;
+                }
+            }
+        }
+
+        let keys = null;
+        let key = '';
+        if (search) {
+            const trimmed = search.trim();
+            if (isChosungQuery(trimmed)) {
+                keys = hierarchy.chosung[level];
+                key = trimmed;
+            } else {
+                keys = hierarchy.jamo[level];
+                key = toJamo(trimmed);
+            }
+        }
+
+        const result = [];
+        for (let code = 0; code < dict.length && result.length < hierarchy.limit; code++) {
+            if (found[code] && (!keys || keys[code].includes(key))) {
+                result.push(dict[code]);
+            }
+        }
+        return result;
+    }
+
+    function levelOf(outputId) {
+        return parseInt(outputId.split('-').pop(), 10);
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        filters: {
+            // 첫 번째 필터: 검색어 입력
+            searchFirst: function (searchValue, selected, hierarchy) {
+                const noUpdate = window.dash_clientside.no_update;
+                if (!hierarchy) {
+                    return [noUpdate, {parents: [], search: searchValue, selected: selected}];
+                }
+                const values = matchValues(hierarchy, 0, [], searchValue);
+                return [toOptions(values, selected, searchValue), noUpdate];
+            },
+
+            // 두 번째 이후 필터: 상위 필터 변경 또는 검색어 입력
+            cascade: function (parentValue, searchValue, ...args) {
+                const noUpdate = window.dash_clientside.no_update;
+                const ctx = window.dash_clientside.callback_context;
+                const level = levelOf(ctx.outputs_list[0].id);
+                const hierarchy = args[args.length - 1];
+                const hCols = args[args.length - 2];
+                const selected = args[args.length - 3];
+                const ancestors = args.slice(0, args.length - 3);
+
+                if (!parentValue || !parentValue.length || !hCols || level >= hCols.length) {
+                    return [[], null, noUpdate];
+                }
+
+                // 검색어 입력이면 선택값을 유지하고, 상위 필터가 바뀌었으면 초기화합니다.
+                const searching = ctx.triggered.some((t) => t.prop_id === `h-filter-${level}.search_value`);
+                const keep = searching ? selected : null;
+                const search = searching ? searchValue : null;
+                const parents = ancestors.concat([parentValue]);
+
+                if (!hierarchy) {
+                    return [noUpdate, searching ? noUpdate : null, {parents: parents, search: search, selected: keep}];
+                }
+                const values = matchValues(hierarchy, level, parents, search);
+                return [toOptions(values, keep, search), searching ? noUpdate : null, noUpdate];
+            }
+        }
+    });
+})();
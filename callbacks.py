@@ -1,17 +1,75 @@
 
-from dash.dependencies import Input, Output, State, ALL
+from dash.dependencies import Input, Output, State, ALL, ClientsideFunction
 from dash import html, dcc, dash
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
 import pandas as pd
 import numpy as np
 import plotly.express as px
 import sqlite3
 import glob
+import math
 import os
 
 # 프로젝트의 다른 파일에서 함수들을 가져옵니다.
 from data_collector import collect_and_save_data
 from visualizations import create_matplotlib_figure, fig_to_base64, create_brand_rank_chart
+from analytics import METRIC_COLUMNS, available_metric_columns, select_with_metrics_sql
+from data_browser import fetch_page
+from db_utils import detect_hierarchy_columns, table_name_for
+from search_index import encode_filter_hierarchy, search_options
+from frame_loader import load_compact_frame
+from comparison import DATASET_COLUMN, comparison_numeric_columns, run_comparison
+
+def _to_options(values, selected=None, search_value=None):
+    """
+    드롭다운 옵션 목록을 만듭니다. 이미 선택된 값은 검색 결과에 없어도 유지합니다.
+    초성·자모 검색 결과가 브라우저의 라벨 필터에 걸러지지 않도록 검색어를 search 필드에 넣습니다.
+    """
+    values = list(selected or []) + [v for v in values if v not in (selected or [])]
+    options = []
+    for v in values:
+        option = {'label': v, 'value': v}
+        if search_value:
+            option['search'] = f'{v} {search_value}'
+        options.append(option)
+    return options
+
+
+def _build_figure(agg_df, df, chart_type, xaxis, yaxis, agg, group, top_n):
+    """집계된 데이터로 정렬·상위 N개 선택 후 차트를 만듭니다. df는 파이 차트 집계에 사용합니다."""
+    # 3. 정렬 및 상위 N개 선택
+    # 파이 차트가 아닐 경우에만 정렬 적용
+    if chart_type != 'pie':
+        agg_df = agg_df.sort_values(by=yaxis, ascending=False)
+        if top_n and top_n > 0:
+            agg_df = agg_df.head(top_n)
+
+    # 4. 차트 생성
+    try:
+        title = f'{xaxis} 별 {yaxis} {agg} 분석'
+        if top_n and top_n > 0:
+            title += f' (상위 {top_n}개)'
+
+        if chart_type == 'bar':
+            fig = px.bar(agg_df, x=xaxis, y=yaxis, color=group, barmode='group', title=title)
+        elif chart_type == 'line':
+            fig = px.line(agg_df, x=xaxis, y=yaxis, color=group, title=title)
+        elif chart_type == 'pie':
+            if group: # 파이차트는 그룹화 미지원
+                return px.bar(title="파이 차트는 그룹화(색상) 기능을 지원하지 않습니다.")
+            # 파이차트는 상위 N개 로직을 다르게 적용해야 할 수 있음 (여기서는 집계 후 전체 비율 표시)
+            pie_df = df.groupby(xaxis, observed=True)[yaxis].agg(agg).reset_index()
+            if top_n and top_n > 0:
+                pie_df = pie_df.sort_values(by=yaxis, ascending=False).head(top_n)
+            fig = px.pie(pie_df, names=xaxis, values=yaxis, title=title)
+        else:
+            fig = px.bar(title="알 수 없는 차트 종류")
+    except Exception as e:
+        return px.bar(title=f"차트 생성 중 오류 발생: {e}")
+
+    return fig
+
 
 def register_callbacks(app):
     # 1. 데이터 수집 및 스키마 표시 콜백
@@ -23,14 +81,15 @@ def register_callbacks(app):
         State('start-year-input', 'value'),
         State('end-year-input', 'value'),
         State('delay-input', 'value'),
+        State('cache-mode-input', 'value'),
         prevent_initial_call=True
     )
-    def handle_data_collection(n_clicks, api_url, db_name, start_year, end_year, delay):
+    def handle_data_collection(n_clicks, api_url, db_name, start_year, end_year, delay, cache_mode):
         if not all([api_url, db_name, start_year, end_year, delay is not None]):
             return "API URL, DB 파일 이름, 시작/종료 연도, 지연 시간을 모두 입력해주세요."
 
         # 데이터 수집 함수 호출
-        log_output = collect_and_save_data(api_url, db_name, start_year, end_year, delay)
+        log_output = collect_and_save_data(api_url, db_name, start_year, end_year, delay, cache_mode or 'use')
 
         # 성공적으로 수집되었는지 확인
         if "성공!" in log_output:
@@ -122,98 +181,98 @@ def register_callbacks(app):
         Output('h-filter-container-3', 'children'),
         Output('h-filter-container-4', 'children'),
         Output('h-filter-cols', 'data'),
+        Output('h-filter-hierarchy', 'data'),
         Input('dataset-dropdown', 'value'),
         prevent_initial_call=True
     )
     def generate_filters_layout(db_file):
         if not db_file:
-            return [None] * 5 + [None]
+            return [None] * 5 + [None, None]
 
         try:
             conn = sqlite3.connect(db_file)
             table_name = os.path.splitext(os.path.basename(db_file))[0]
             df_schema = pd.read_sql_query(f'SELECT * FROM "{table_name}" LIMIT 1', conn)
-
-            h_cols = []
-            for col in df_schema.columns:
-                is_numeric = pd.api.types.is_numeric_dtype(df_schema[col].dtype)
-                if is_numeric and col != 'yr':
-                    break
-                h_cols.append(col)
-                if len(h_cols) >= 5:
-                    break
+            h_cols = detect_hierarchy_columns(df_schema)
             
             filters = [None] * 5
             for i, col in enumerate(h_cols):
                 options = []
                 if i == 0:
-                    query = f'SELECT DISTINCT "{col}" FROM "{table_name}" ORDER BY "{col}" DESC' if col == 'yr' else f'SELECT DISTINCT "{col}" FROM "{table_name}" ORDER BY "{col}" ASC'
-                    options_df = pd.read_sql_query(query, conn)
-                    options = [{'label': opt, 'value': opt} for opt in options_df[col].dropna()]
+                    # 고유값이 많은 칼럼도 처음에는 일부만 보내고, 나머지는 검색으로 찾습니다.
+                    options = _to_options(search_options(conn, table_name, h_cols, 0, [], None))
 
                 filters[i] = html.Div([
                     dbc.Label(col),
-                    dcc.Dropdown(id=f'h-filter-{i}', options=options, multi=True, placeholder=f'{col} 선택...'),
+                    dcc.Dropdown(id=f'h-filter-{i}', options=options, multi=True, placeholder=f'{col} 검색 또는 선택...'),
                     html.Br()
                 ])
+
+            # 계층 칼럼이 5개보다 적어도 필터를 입력으로 쓰는 콜백이 동작하도록 숨김 드롭다운을 둡니다.
+            for i in range(len(h_cols), 5):
+                filters[i] = html.Div(dcc.Dropdown(id=f'h-filter-{i}', multi=True), style={'display': 'none'})
             
+            # 필터 조합을 한 번만 보내 두면 이후 연계 필터는 브라우저에서 바로 계산됩니다.
+            hierarchy = encode_filter_hierarchy(conn, table_name, h_cols) if h_cols else None
+
             conn.close()
-            return filters[0], filters[1], filters[2], filters[3], filters[4], h_cols
+            return filters[0], filters[1], filters[2], filters[3], filters[4], h_cols, hierarchy
         except Exception as e:
             print(f"필터 레이아웃 생성 오류: {e}")
-            return [None] * 5 + [None]
+            return [None] * 5 + [None, None]
+
+    # 6. 연계 필터 (최대 5단계)
+    # 상위 필터 변경·검색어 입력은 assets/filter_cascade.js의 clientside 콜백이 처리합니다.
+    # 필터 조합이 많아 'h-filter-hierarchy'가 비어 있는 데이터셋만 'h-filter-request-N'을 거쳐 서버에서 검색합니다.
+    app.clientside_callback(
+        ClientsideFunction(namespace='filters', function_name='searchFirst'),
+        Output('h-filter-0', 'options'),
+        Output('h-filter-request-0', 'data'),
+        Input('h-filter-0', 'search_value'),
+        State('h-filter-0', 'value'),
+        State('h-filter-hierarchy', 'data'),
+        prevent_initial_call=True
+    )
 
-    # 6. 연계 필터 콜백 체인 (최대 5단계)
-    def create_cascading_callback(level):
-        @app.callback(
+    for level in range(1, 5):
+        app.clientside_callback(
+            ClientsideFunction(namespace='filters', function_name='cascade'),
             Output(f'h-filter-{level}', 'options'),
             Output(f'h-filter-{level}', 'value'),
+            Output(f'h-filter-request-{level}', 'data'),
             Input(f'h-filter-{level-1}', 'value'),
+            Input(f'h-filter-{level}', 'search_value'),
             [State(f'h-filter-{j}', 'value') for j in range(level-1)],
-            State('dataset-dropdown', 'value'),
+            State(f'h-filter-{level}', 'value'),
             State('h-filter-cols', 'data'),
+            State('h-filter-hierarchy', 'data'),
             prevent_initial_call=True
         )
-        def update_options(parent_value, *args):
-            # *args를 사용하여 모든 State 인자를 튜플로 받음
-            # 마지막 두 인자는 db_file, h_cols로 고정됨
-            db_file = args[-2]
-            h_cols = args[-1]
-            grandparent_values = args[:-2]
 
-            if not parent_value or not db_file or not h_cols or level >= len(h_cols):
-                return [], None
+    def create_server_search_callback(level):
+        @app.callback(
+            Output(f'h-filter-{level}', 'options', allow_duplicate=True),
+            Input(f'h-filter-request-{level}', 'data'),
+            State('dataset-dropdown', 'value'),
+            State('h-filter-cols', 'data'),
+            prevent_initial_call=True
+        )
+        def search_on_server(request, db_file, h_cols):
+            if not request or not db_file or not h_cols or level >= len(h_cols):
+                return []
 
             conn = sqlite3.connect(db_file)
-            table_name = os.path.splitext(os.path.basename(db_file))[0]
-            current_col = h_cols[level]
-
-            all_parent_vals = list(grandparent_values) + [parent_value]
-            
-            where_clauses = []
-            params = []
-            for i, val_list in enumerate(all_parent_vals):
-                if val_list:
-                    col_name = h_cols[i]
-                    placeholders = ', '.join('?' for _ in val_list)
-                    where_clauses.append(f'"{col_name}" IN ({placeholders})')
-                    params.extend(val_list)
-
-            query = f'SELECT DISTINCT "{current_col}" FROM "{table_name}"'
-            if where_clauses:
-                query += " WHERE " + " AND ".join(where_clauses)
-            query += f' ORDER BY "{current_col}" ASC'
-
             try:
-                df = pd.read_sql_query(query, conn, params=params)
-                options = [{'label': i, 'value': i} for i in df[current_col].dropna()]
-                return options, None
+                values = search_options(
+                    conn, table_name_for(db_file), h_cols, level, request['parents'], request['search']
+                )
             finally:
                 conn.close()
-        return update_options
+            return _to_options(values, request['selected'], request['search'])
+        return search_on_server
 
-    for i in range(1, 5):
-        create_cascading_callback(i)
+    for i in range(5):
+        create_server_search_callback(i)
 
     # 7. 차트 빌더 옵션 업데이트
     @app.callback(
@@ -221,15 +280,17 @@ def register_callbacks(app):
         Output('chart-builder-yaxis', 'options'),
         Output('chart-builder-group', 'options'),
         Input('dataset-dropdown', 'value'),
+        Input('compare-dataset-dropdown', 'value'),
         prevent_initial_call=True
     )
-    def update_chart_builder_options(db_file):
+    def update_chart_builder_options(db_file, compare_files):
         if not db_file:
             return [], [], []
         
         conn = sqlite3.connect(db_file)
         table_name = os.path.splitext(os.path.basename(db_file))[0]
         df = pd.read_sql_query(f'SELECT * FROM "{table_name}" LIMIT 5', conn)
+        metric_cols = available_metric_columns(conn, table_name)
         conn.close()
 
         numeric_cols = df.select_dtypes(include=np.number).columns.tolist()
@@ -237,12 +298,37 @@ def register_callbacks(app):
 
         cat_options = [{'label': col, 'value': col} for col in categorical_cols]
         num_options = [{'label': col, 'value': col} for col in numeric_cols]
+        # 수집 시 계산된 파생 지표도 Y축으로 선택할 수 있습니다.
+        num_options += [{'label': f'{METRIC_COLUMNS[col]} ({col})', 'value': col} for col in metric_cols]
+
+        # 비교 데이터셋에만 있는 숫자 칼럼도 (조인 비교용) Y축 후보로 추가합니다.
+        compare_files = [f for f in (compare_files or []) if f != db_file]
+        if compare_files:
+            known = {opt['value'] for opt in num_options}
+            for col, label in comparison_numeric_columns(compare_files):
+                if col not in known:
+                    num_options.append({'label': f'{col} ({label})', 'value': col})
+                    known.add(col)
         
         return cat_options, num_options, cat_options
 
+    # 7-1. 비교 데이터셋 후보 (현재 선택한 DB를 제외한 나머지)
+    @app.callback(
+        Output('compare-dataset-dropdown', 'options'),
+        Output('compare-dataset-dropdown', 'value'),
+        Input('dataset-dropdown', 'value'),
+        prevent_initial_call=True
+    )
+    def update_compare_dataset_options(db_file):
+        if not db_file:
+            return [], None
+        db_files = [f for f in glob.glob('*.db') if f != db_file]
+        return [{'label': os.path.basename(f), 'value': f} for f in db_files], None
+
     # 8. 최종 그래프 생성 콜백
     @app.callback(
         Output('visualization-graph', 'figure'),
+        Output('debug-output', 'children'),
         Input('update-graph-button', 'n_clicks'),
         State('dataset-dropdown', 'value'),
         State('chart-builder-chart-type', 'value'),
@@ -257,21 +343,54 @@ def register_callbacks(app):
         State('h-filter-2', 'value'),
         State('h-filter-3', 'value'),
         State('h-filter-4', 'value'),
+        State('compare-dataset-dropdown', 'value'),
+        State('compare-mode', 'value'),
         prevent_initial_call=True
     )
-    def update_graph_final(n_clicks, db_file, chart_type, xaxis, yaxis, agg, group, top_n, h_cols, f0, f1, f2, f3, f4):
+    def update_graph_final(n_clicks, db_file, chart_type, xaxis, yaxis, agg, group, top_n, h_cols, f0, f1, f2, f3, f4,
+                           compare_files, compare_mode):
         filter_values = [f0, f1, f2, f3, f4]
         if not all([db_file, chart_type, xaxis, agg]):
-            return px.bar(title="차트 빌더의 모든 필수 항목(차트 종류, X축, Y축 집계 방식)을 선택해주세요.")
+            return px.bar(title="차트 빌더의 모든 필수 항목(차트 종류, X축, Y축 집계 방식)을 선택해주세요."), ""
         
         if agg != 'count' and not yaxis:
-            return px.bar(title="'개수(Count)'가 아닌 집계 방식에는 Y축을 반드시 선택해야 합니다.")
+            return px.bar(title="'개수(Count)'가 아닌 집계 방식에는 Y축을 반드시 선택해야 합니다."), ""
+
+        compare_files = [f for f in (compare_files or []) if f != db_file]
+        if compare_files:
+            # 비교 모드: 여러 DB를 ATTACH하여 SQLite 안에서 합치기/조인과 집계를 마치고 결과만 가져옵니다.
+            if chart_type == 'pie':
+                return px.bar(title="데이터셋 비교에서는 파이 차트를 지원하지 않습니다."), ""
+            if compare_mode == 'union' and group:
+                return px.bar(title="합치기 비교에서는 데이터셋이 색상 기준이므로 그룹화를 함께 사용할 수 없습니다."), ""
+
+            if agg == 'count':
+                yaxis = 'count'
+            try:
+                agg_df = run_comparison(
+                    [db_file] + compare_files, compare_mode, xaxis, yaxis, agg, group, h_cols, filter_values
+                )
+            except Exception as e:
+                return px.bar(title=f"데이터셋 비교 중 오류 발생: {e}"), ""
+
+            if agg_df.empty:
+                return px.bar(title="비교 결과에 해당하는 데이터가 없습니다."), ""
+            if compare_mode == 'union':
+                group = DATASET_COLUMN
+            return _build_figure(agg_df, None, chart_type, xaxis, yaxis, agg, group, top_n), ""
 
         # 1. 데이터 로드 및 필터링
+        # 문자열 칼럼은 범주형으로, 숫자 칼럼은 작은 타입으로 읽어 메모리와 필터링·집계 시간을 줄입니다.
         conn = sqlite3.connect(db_file)
         table_name = os.path.splitext(os.path.basename(db_file))[0]
-        df = pd.read_sql_query(f'SELECT * FROM "{table_name}"', conn)
+        df, before_bytes, after_bytes = load_compact_frame(conn, db_file, select_with_metrics_sql(conn, table_name))
         conn.close()
+        memory_report = ""
+        if before_bytes:
+            memory_report = (
+                f"데이터 로드: {len(df):,}행, 메모리 {before_bytes / 1024 ** 2:.1f}MB -> {after_bytes / 1024 ** 2:.1f}MB "
+                f"({(1 - after_bytes / before_bytes) * 100:.0f}% 절감)"
+            )
 
         if h_cols:
             for i, vals in enumerate(filter_values):
@@ -280,7 +399,7 @@ def register_callbacks(app):
                     df = df[df[col_name].isin(vals)]
         
         if df.empty:
-            return px.bar(title="필터 결과에 해당하는 데이터가 없습니다.")
+            return px.bar(title="필터 결과에 해당하는 데이터가 없습니다."), memory_report
 
         # 2. 데이터 집계
         group_by_cols = [xaxis]
@@ -289,41 +408,71 @@ def register_callbacks(app):
         
         try:
             if agg == 'count':
-                agg_df = df.groupby(group_by_cols).size().reset_index(name='count')
+                agg_df = df.groupby(group_by_cols, observed=True).size().reset_index(name='count')
                 yaxis = 'count'
             else:
-                agg_df = df.groupby(group_by_cols)[yaxis].agg(agg).reset_index()
+                agg_df = df.groupby(group_by_cols, observed=True)[yaxis].agg(agg).reset_index()
         except Exception as e:
-            return px.bar(title=f"데이터 집계 중 오류 발생: {e}")
+            return px.bar(title=f"데이터 집계 중 오류 발생: {e}"), memory_report
 
-        # 3. 정렬 및 상위 N개 선택
-        # 파이 차트가 아닐 경우에만 정렬 적용
-        if chart_type != 'pie':
-            agg_df = agg_df.sort_values(by=yaxis, ascending=False)
-            if top_n and top_n > 0:
-                agg_df = agg_df.head(top_n)
+        return _build_figure(agg_df, df, chart_type, xaxis, yaxis, agg, group, top_n), memory_report
 
-        # 4. 차트 생성
+    # 9. 데이터 탐색 테이블 (페이지 이동·정렬·필터링을 서버의 SQL에서 처리)
+    @app.callback(
+        Output('data-browser-table', 'data'),
+        Output('data-browser-table', 'columns'),
+        Output('data-browser-table', 'page_count'),
+        Output('data-browser-table', 'page_current'),
+        Output('data-browser-state', 'data'),
+        Output('data-browser-info', 'children'),
+        Input('dataset-dropdown', 'value'),
+        Input('data-browser-table', 'page_current'),
+        Input('data-browser-table', 'page_size'),
+        Input('data-browser-table', 'sort_by'),
+        Input('data-browser-table', 'filter_query'),
+        Input('h-filter-0', 'value'),
+        Input('h-filter-1', 'value'),
+        Input('h-filter-2', 'value'),
+        Input('h-filter-3', 'value'),
+        Input('h-filter-4', 'value'),
+        Input('view-tabs', 'active_tab'),
+        State('h-filter-cols', 'data'),
+        State('data-browser-state', 'data'),
+        prevent_initial_call=True
+    )
+    def update_data_browser(db_file, page_current, page_size, sort_by, filter_query,
+                            f0, f1, f2, f3, f4, active_tab, h_cols, state):
+        # 탭이 숨겨져 있으면 조회하지 않고, 탭을 열 때 현재 조건으로 조회합니다.
+        if active_tab != 'view-browse':
+            raise PreventUpdate
+
+        if not db_file:
+            return [], [], 1, 0, None, "데이터베이스를 선택하면 데이터가 표시됩니다."
+
+        filter_values = [f0, f1, f2, f3, f4]
+
+        # 데이터셋·정렬·필터가 바뀌면 커서를 버리고 첫 페이지부터 다시 조회합니다.
+        signature = [db_file, page_size, sort_by, filter_query, filter_values]
+        if not state or state.get('signature') != signature:
+            state = {'signature': signature, 'cursors': {}, 'total': None}
+            page_current = 0
+        page_current = page_current or 0
+
+        conn = sqlite3.connect(db_file)
         try:
-            title = f'{xaxis} 별 {yaxis} {agg} 분석'
-            if top_n and top_n > 0:
-                title += f' (상위 {top_n}개)'
-
-            if chart_type == 'bar':
-                fig = px.bar(agg_df, x=xaxis, y=yaxis, color=group, barmode='group', title=title)
-            elif chart_type == 'line':
-                fig = px.line(agg_df, x=xaxis, y=yaxis, color=group, title=title)
-            elif chart_type == 'pie':
-                if group: # 파이차트는 그룹화 미지원
-                    return px.bar(title="파이 차트는 그룹화(색상) 기능을 지원하지 않습니다.")
-                # 파이차트는 상위 N개 로직을 다르게 적용해야 할 수 있음 (여기서는 집계 후 전체 비율 표시)
-                pie_df = df.groupby(xaxis)[yaxis].agg(agg).reset_index()
-                if top_n and top_n > 0:
-                    pie_df = pie_df.sort_values(by=yaxis, ascending=False).head(top_n)
-                fig = px.pie(pie_df, names=xaxis, values=yaxis, title=title)
-            else:
-                fig = px.bar(title="알 수 없는 차트 종류")
-        except Exception as e:
-            return px.bar(title=f"차트 생성 중 오류 발생: {e}")
+            columns, rows, total = fetch_page(
+                conn, table_name_for(db_file), page_current, page_size, sort_by, filter_query,
+                h_cols, filter_values, state['cursors'], with_total=state['total'] is None
+            )
+        except sqlite3.Error as e:
+            return [], [], 1, 0, None, dbc.Alert(f"데이터 조회 중 오류 발생: {e}", color="danger")
+        finally:
+            conn.close()
+
+        if total is not None:
+            state['total'] = total
+        page_count = max(math.ceil(state['total'] / page_size), 1)
 
-        return fig
+        info = f"조건에 맞는 데이터 {state['total']:,}건 · {page_current + 1} / {page_count} 페이지"
+        table_columns = [{'name': col, 'id': col} for col in columns]
+        return rows, table_columns, page_count, page_current, state, info
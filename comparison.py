@@ -0,0 +1,163 @@
+import os
+
+import pandas as pd
+
+from analytics import available_metric_columns, select_with_metrics_sql
+from db_utils import attach_database, build_filter_clauses, get_pooled_connection, table_name_for
+
+# 비교 방식
+# - 'union': 데이터셋을 위아래로 이어 붙여 데이터셋별로 집계 (색상 = 데이터셋)
+# - 'join': 공통 키(브랜드명·연도)로 데이터셋을 연결하여, 다른 데이터셋의 칼럼도 Y축으로 집계
+COMPARE_MODES = ('union', 'join')
+
+# 조인에 사용할 키 후보 (모든 데이터셋에 있는 키만 사용)
+DEFAULT_JOIN_KEYS = ['brandNm', 'yr']
+
+# 합치기 모드에서 데이터셋 이름이 들어가는 칼럼
+DATASET_COLUMN = '데이터셋'
+
+SQL_AGGREGATES = {'sum': 'SUM', 'mean': 'AVG', 'count': 'COUNT'}
+
+
+def _dataset_sources(conn, db_files):
+    """각 DB를 ATTACH하고, 조회에 쓸 SQL과 칼럼 목록(파생 지표 포함)을 모읍니다."""
+    sources = []
+    for db_file in db_files:
+        alias = attach_database(db_file)
+        table_name = table_name_for(db_file)
+        columns = [row[1] for row in conn.execute(f'PRAGMA {alias}.table_info("{table_name}")')]
+        columns += available_metric_columns(conn, table_name, schema=alias)
+        sources.append({
+            'label': os.path.basename(db_file),
+            'columns': columns,
+            'sql': select_with_metrics_sql(conn, table_name, schema=alias),
+        })
+    return sources
+
+
+def comparison_numeric_columns(db_files):
+    """비교 대상 DB들의 숫자 칼럼을 (칼럼명, DB 파일명) 목록으로 반환합니다."""
+    conn = get_pooled_connection()
+    result = []
+    for src in _dataset_sources(conn, db_files):
+        sample = pd.read_sql_query(f'SELECT * FROM ({src["sql"]}) LIMIT 5', conn)
+        for col in sample.select_dtypes(include='number').columns:
+            result.append((col, src['label']))
+    return result
+
+
+def _filters_for(h_cols, filter_values, columns, alias=None):
+    """해당 데이터셋에 있는 계층 칼럼의 필터만 적용합니다."""
+    applicable = [
+        vals if i < len(h_cols) and h_cols[i] in columns else None
+        for i, vals in enumerate(filter_values)
+    ]
+    return build_filter_clauses(h_cols, applicable, alias=alias)
+
+
+def _union_query(sources, xaxis, yaxis, agg, h_cols, filter_values):
+    needed = [xaxis] if agg == 'count' else [xaxis, yaxis]
+    parts = []
+    params = []
+    for src in sources:
+        missing = [col for col in needed if col not in src['columns']]
+        if missing:
+            raise ValueError(f"'{src['label']}'에 '{missing[0]}' 칼럼이 없어 합칠 수 없습니다.")
+
+        where_clauses, where_params = _filters_for(h_cols, filter_values, src['columns'])
+        select_cols = ", ".join(f'"{col}"' for col in needed)
+        part = f'SELECT ? AS "{DATASET_COLUMN}", {select_cols} FROM ({src["sql"]})'
+        if where_clauses:
+            part += " WHERE " + " AND ".join(where_clauses)
+        parts.append(part)
+        params += [src['label']] + where_params
+
+    value_sql = 'COUNT(*)' if agg == 'count' else f'{SQL_AGGREGATES[agg]}("{yaxis}")'
+    query = (
+        f'SELECT "{DATASET_COLUMN}", "{xaxis}", {value_sql} AS "{yaxis}" '
+        f'FROM ({" UNION ALL ".join(parts)}) '
+        f'GROUP BY "{DATASET_COLUMN}", "{xaxis}"'
+    )
+    return query, params
+
+
+def _join_query(sources, xaxis, yaxis, agg, group, h_cols, filter_values):
+    primary = sources[0]
+    keys = [key for key in DEFAULT_JOIN_KEYS if all(key in src['columns'] for src in sources)]
+    if not keys:
+        raise ValueError(f"모든 데이터셋에 공통으로 있는 조인 키({', '.join(DEFAULT_JOIN_KEYS)})가 없습니다.")
+
+    group_cols = [xaxis] + ([group] if group and group != xaxis else [])
+    missing = [col for col in group_cols if col not in primary['columns']]
+    if missing:
+        raise ValueError(f"X축/그룹 칼럼 '{missing[0]}'은(는) 기준 데이터셋 '{primary['label']}'에 있어야 합니다.")
+
+    # Y축 칼럼은 기준 데이터셋부터 차례로 찾아, 처음 가진 데이터셋의 값을 사용합니다.
+    y_index = 0
+    if agg != 'count':
+        y_index = next((i for i, src in enumerate(sources) if yaxis in src['columns']), None)
+        if y_index is None:
+            raise ValueError(f"어느 데이터셋에도 '{yaxis}' 칼럼이 없습니다.")
+
+    # 기준 데이터셋도 키·그룹 칼럼별로 먼저 집계합니다.
+    # 한 키에 여러 행(예: 지역별 행)이 있으면 조인 시 비교 데이터셋 값이 그 수만큼 중복 집계되기 때문입니다.
+    primary_cols = list(dict.fromkeys(keys + group_cols))
+    primary_list = ", ".join(f'"{col}"' for col in primary_cols)
+    primary_select = [primary_list]
+    if agg == 'count':
+        primary_select.append('COUNT(*) AS "__rows"')
+        value_sql = 'SUM(a."__rows")'
+    elif y_index == 0:
+        # 평균은 키별 평균의 평균이 되지 않도록 합계와 개수를 따로 모아 마지막에 나눕니다.
+        primary_select.append(f'SUM("{yaxis}") AS "{yaxis}", COUNT("{yaxis}") AS "__rows"')
+        value_sql = (
+            f'SUM(a."{yaxis}")' if agg == 'sum' else f'SUM(a."{yaxis}") * 1.0 / SUM(a."__rows")'
+        )
+    elif agg == 'sum':
+        value_sql = f'SUM(b{y_index}."{yaxis}")'
+    else:
+        value_sql = f'SUM(b{y_index}."{yaxis}") * 1.0 / SUM(b{y_index}."__rows")'
+
+    where_clauses, params = _filters_for(h_cols, filter_values, primary['columns'])
+    primary_sql = f'SELECT {", ".join(primary_select)} FROM ({primary["sql"]})'
+    if where_clauses:
+        primary_sql += " WHERE " + " AND ".join(where_clauses)
+    primary_sql += f" GROUP BY {primary_list}"
+
+    joins = []
+    for i, src in enumerate(sources[1:], start=1):
+        # 비교 데이터셋은 키별로 먼저 집계하여 조인 결과의 행이 불어나지 않도록 합니다.
+        select_cols = [f'"{key}"' for key in keys]
+        if agg != 'count' and i == y_index:
+            # 기준 데이터셋과 같이 평균은 합계와 개수를 모아 마지막에 나눕니다. (평균의 평균 방지)
+            select_cols.append(f'SUM("{yaxis}") AS "{yaxis}"')
+            if agg == 'mean':
+                select_cols.append(f'COUNT("{yaxis}") AS "__rows"')
+        key_list = ", ".join(f'"{key}"' for key in keys)
+        on_clause = " AND ".join(f'a."{key}" = b{i}."{key}"' for key in keys)
+        joins.append(
+            f'JOIN (SELECT {", ".join(select_cols)} FROM ({src["sql"]}) GROUP BY {key_list}) AS b{i} ON {on_clause}'
+        )
+
+    select_group = ", ".join(f'a."{col}" AS "{col}"' for col in group_cols)
+    query = f'SELECT {select_group}, {value_sql} AS "{yaxis}" FROM ({primary_sql}) AS a ' + " ".join(joins)
+    query += " GROUP BY " + ", ".join(f'a."{col}"' for col in group_cols)
+    return query, params
+
+
+def run_comparison(db_files, mode, xaxis, yaxis, agg, group, h_cols, filter_values):
+    """
+    여러 DB를 하나의 풀 연결에 ATTACH하여 SQLite 안에서 합치기/조인과 집계를 수행하고,
+    집계가 끝난 결과만 DataFrame으로 반환합니다. 첫 번째 DB가 기준 데이터셋입니다.
+    count 집계에서는 yaxis 이름으로 개수 칼럼을 만듭니다.
+    """
+    if mode not in COMPARE_MODES:
+        raise ValueError(f"알 수 없는 비교 방식입니다: {mode}")
+
+    conn = get_pooled_connection()
+    sources = _dataset_sources(conn, db_files)
+    if mode == 'union':
+        query, params = _union_query(sources, xaxis, yaxis, agg, h_cols, filter_values)
+    else:
+        query, params = _join_query(sources, xaxis, yaxis, agg, group, h_cols, filter_values)
+    return pd.read_sql_query(query, conn, params=params)
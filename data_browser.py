@@ -0,0 +1,160 @@
+from db_utils import build_filter_clauses, ensure_column_index
+
+# 데이터 탐색 테이블의 한 페이지 행 수
+PAGE_SIZE = 50
+
+# dash_table의 filter_query 연산자와 대응하는 SQL 연산자
+# (Dash 문서의 custom filtering 예제와 같은 방식으로 해석합니다.)
+FILTER_OPERATORS = [
+    ['ge ', '>='],
+    ['le ', '<='],
+    ['lt ', '<'],
+    ['gt ', '>'],
+    ['ne ', '!='],
+    ['eq ', '='],
+    ['contains '],
+    ['datestartswith '],
+]
+
+# 커서 계산용으로 함께 조회하는 rowid 칼럼 이름
+ROWID_COLUMN = '__rowid__'
+
+
+def split_filter_part(filter_part):
+    """'{칼럼} 연산자 값' 형태의 조건 하나를 (칼럼, 연산자, 값)으로 나눕니다."""
+    for operator_type in FILTER_OPERATORS:
+        for operator in operator_type:
+            if operator in filter_part:
+                name_part, value_part = filter_part.split(operator, 1)
+                name = name_part[name_part.find('{') + 1: name_part.rfind('}')]
+
+                value_part = value_part.strip()
+                v0 = value_part[0] if value_part else ''
+                if v0 and v0 == value_part[-1] and v0 in ("'", '"', '`'):
+                    value = value_part[1: -1].replace('\\' + v0, v0)
+                elif len(operator_type) == 1:
+                    # contains·datestartswith는 문자열 비교이므로 '24'가 '24.0'이 되지 않도록 그대로 둡니다.
+                    value = value_part
+                else:
+                    try:
+                        value = float(value_part)
+                    except ValueError:
+                        value = value_part
+
+                # 연산자는 단어 형태(eq)와 기호 형태(=)를 모두 같은 SQL 연산자로 바꿉니다.
+                return name, operator_type[-1].strip(), value
+
+    return None, None, None
+
+
+def build_table_filter(filter_query, columns):
+    """dash_table의 filter_query를 WHERE 조건 목록과 파라미터 목록으로 변환합니다."""
+    where_clauses = []
+    params = []
+    if not filter_query:
+        return where_clauses, params
+
+    for filter_part in filter_query.split(' && '):
+        col_name, operator, value = split_filter_part(filter_part)
+        # 실제 테이블 칼럼만 허용하여 SQL에 임의 문자열이 들어가지 않도록 합니다.
+        if col_name not in columns:
+            continue
+
+        if operator == 'contains':
+            where_clauses.append(f'"{col_name}" LIKE ?')
+            params.append(f'%{value}%')
+        elif operator == 'datestartswith':
+            where_clauses.append(f'"{col_name}" LIKE ?')
+            params.append(f'{value}%')
+        else:
+            where_clauses.append(f'"{col_name}" {operator} ?')
+            params.append(value)
+    return where_clauses, params
+
+
+def _keyset_clause(sort_col, descending, cursor):
+    """
+    직전 페이지의 마지막 행(cursor) 다음 행부터 조회하는 조건을 만듭니다.
+    (조건, 파라미터, 이어서 읽을 NULL 구간 조건)을 반환합니다. 조건에 OR로 NULL 구간을 섞으면
+    인덱스 범위 검색 대신 인덱스 전체를 훑게 되므로, NULL 구간은 페이지가 덜 찼을 때 따로 읽습니다.
+    """
+    if sort_col is None:
+        return 'rowid > ?', [cursor[1]], None
+
+    value, rowid = cursor
+    # SQLite는 NULL을 오름차순에서 가장 앞, 내림차순에서 가장 뒤로 정렬합니다.
+    if descending:
+        if value is None:
+            return f'"{sort_col}" IS NULL AND rowid < ?', [rowid], None
+        return (
+            f'"{sort_col}" <= ? AND ("{sort_col}" < ? OR rowid < ?)', [value, value, rowid],
+            f'"{sort_col}" IS NULL'
+        )
+
+    if value is None:
+        return f'"{sort_col}" IS NULL AND rowid > ?', [rowid], f'"{sort_col}" IS NOT NULL'
+    return f'"{sort_col}" >= ? AND ("{sort_col}" > ? OR rowid > ?)', [value, value, rowid], None
+
+
+def fetch_page(conn, table_name, page, page_size, sort_by, filter_query,
+               h_cols, filter_values, cursors, with_total=False):
+    """
+    데이터 탐색 테이블의 한 페이지를 조회합니다.
+
+    직전 페이지의 마지막 행을 커서로 기억해 두고 키셋 페이지네이션으로 다음 페이지를 읽으므로
+    깊은 페이지도 첫 페이지와 비슷한 속도로 조회됩니다. 커서를 모르는 페이지로 바로 이동할 때만
+    OFFSET을 사용합니다. cursors는 {페이지 번호(str): [정렬값, rowid]} 형태이며 갱신됩니다.
+    (칼럼 목록, 행 목록, 조건에 맞는 전체 행 수)를 반환하며, 전체 행 수는 with_total일 때만 셉니다.
+    """
+    columns = [row[1] for row in conn.execute(f'PRAGMA table_info("{table_name}")')]
+
+    sort_col = None
+    descending = False
+    if sort_by and sort_by[0]['column_id'] in columns:
+        sort_col = sort_by[0]['column_id']
+        descending = sort_by[0]['direction'] == 'desc'
+        # 인덱스에는 rowid가 함께 저장되므로 (정렬값, rowid) 순서로 바로 읽을 수 있습니다.
+        ensure_column_index(conn, table_name, sort_col)
+
+    where_clauses, params = build_filter_clauses(h_cols, filter_values)
+    table_clauses, table_params = build_table_filter(filter_query, columns)
+    where_clauses += table_clauses
+    params += table_params
+
+    total = None
+    if with_total:
+        count_sql = f'SELECT COUNT(*) FROM "{table_name}"'
+        if where_clauses:
+            count_sql += " WHERE " + " AND ".join(where_clauses)
+        total = conn.execute(count_sql, params).fetchone()[0]
+
+    direction = 'DESC' if descending else 'ASC'
+    order_sql = f'"{sort_col}" {direction}, rowid {direction}' if sort_col else 'rowid ASC'
+
+    def select_rows(extra_clause, extra_params, limit, offset=0):
+        clauses = where_clauses + ([extra_clause] if extra_clause else [])
+        query = f'SELECT rowid AS "{ROWID_COLUMN}", * FROM "{table_name}"'
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += f' ORDER BY {order_sql} LIMIT ? OFFSET ?'
+        result = conn.execute(query, params + extra_params + [limit, offset])
+        names = [d[0] for d in result.description]
+        return [dict(zip(names, row)) for row in result.fetchall()]
+
+    cursor = cursors.get(str(page - 1)) if page > 0 else None
+    if cursor is not None:
+        keyset_sql, keyset_params, tail_sql = _keyset_clause(sort_col, descending, cursor)
+        rows = select_rows(keyset_sql, keyset_params, page_size)
+        # 정렬값 구간을 다 읽었는데 페이지가 덜 찼으면 이어지는 NULL(또는 NULL 다음) 구간을 읽습니다.
+        if tail_sql and len(rows) < page_size:
+            rows += select_rows(tail_sql, [], page_size - len(rows))
+    else:
+        rows = select_rows(None, [], page_size, page * page_size)
+
+    if rows:
+        last = rows[-1]
+        cursors[str(page)] = [last[sort_col] if sort_col else None, last[ROWID_COLUMN]]
+    for row in rows:
+        row.pop(ROWID_COLUMN)
+
+    return columns, rows, total
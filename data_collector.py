@@ -1,19 +1,186 @@
-
 import requests
 import pandas as pd
 import sqlite3
 import time
 import math
 import os
+import json
+import datetime
 from urllib.parse import urlparse, parse_qs
 
-def collect_and_save_data(api_url, db_name, start_year, end_year, delay=1.0):
+import api_cache
+from analytics import build_franchise_metrics
+from db_utils import detect_hierarchy_columns
+from search_index import build_search_index
+
+# orjson이 설치되어 있으면 더 빠른 JSON 파서를 사용합니다.
+# (orjson.JSONDecodeError는 json.JSONDecodeError의 하위 클래스입니다.)
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# 캐시 사용 방식
+# - 'use': 지난 연도(마감된 데이터)는 캐시를 그대로 사용하고, 올해 데이터만 조건부 재요청
+# - 'refresh': 캐시가 있어도 모든 페이지를 조건부 재요청 (ETag / Last-Modified)
+# - 'replay': 네트워크를 사용하지 않고 캐시된 응답만으로 테이블을 다시 생성
+CACHE_MODES = ('use', 'refresh', 'replay')
+
+# 기본 페이지 크기와, 엔드포인트가 허용하는지 큰 값부터 시험해 볼 페이지 크기 후보
+DEFAULT_PAGE_SIZE = 100
+PAGE_SIZE_CANDIDATES = (1000, 500, 300, DEFAULT_PAGE_SIZE)
+
+# 공공데이터포털 API의 정상 응답 결과 코드
+SUCCESS_RESULT_CODES = ('00', '0', '000', 'INFO-000')
+
+
+def _fetch_page(api_url, params, endpoint, year, page_no, num_of_rows, cache_mode):
+    """
+    한 페이지의 원본 응답을 가져옵니다.
+    (원본 bytes, 새로 받은 응답의 캐시 정보 또는 None, 네트워크 사용 여부)를 반환합니다.
+    캐시 전용 모드에서 캐시가 없으면 원본은 None입니다.
+    """
+    cached = api_cache.lookup(endpoint, year, page_no, num_of_rows)
+
+    if cache_mode == 'replay':
+        return (api_cache.read_body(cached['content_hash']) if cached else None), None, False
+
+    # 지난 연도의 데이터는 바뀌지 않으므로 캐시를 그대로 사용합니다.
+    if cached and cache_mode == 'use' and year < datetime.date.today().year:
+        return api_cache.read_body(cached['content_hash']), None, False
+
+    headers = {}
+    if cached:
+        if cached['etag']:
+            headers['If-None-Match'] = cached['etag']
+        if cached['last_modified']:
+            headers['If-Modified-Since'] = cached['last_modified']
+
+    response = requests.get(api_url, params=params, headers=headers)
+    if response.status_code == 304 and cached:
+        api_cache.touch(endpoint, year, page_no, num_of_rows)
+        return api_cache.read_body(cached['content_hash']), None, True
+
+    response.raise_for_status()
+    validators = {
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+    }
+    return response.content, validators, True
+
+
+def _result_code(data):
+    """응답의 resultCode를 찾아 반환합니다. (header 안 또는 최상위, 없으면 None)"""
+    for container in (data.get('response', {}).get('header', {}), data.get('header', {}), data):
+        if isinstance(container, dict) and 'resultCode' in container:
+            return str(container['resultCode'])
+    return None
+
+
+def _parse_page(raw):
+    """
+    원본 응답을 해석하여 (items 리스트, totalCount, body, 정상 응답 여부)를 반환합니다.
+    정상 응답은 body에 totalCount가 있고, resultCode가 있다면 성공 코드인 응답입니다.
+    """
+    data = _json_loads(raw)
+
+    body = data.get('response', {}).get('body', {})
+    if not body:
+        body = data
+
+    result_code = _result_code(data)
+    ok = 'totalCount' in body and (result_code is None or result_code in SUCCESS_RESULT_CODES)
+
+    items = body.get('items', [])
+    total_count = int(body.get('totalCount', 0))
+
+    if isinstance(items, dict) and 'item' in items:
+        items = items.get('item', [])
+
+    if isinstance(items, dict):
+        items = [items]
+
+    return items or [], total_count, body, ok
+
+
+def _probe_page_size(api_url, params, endpoint, year, cache_mode, delay):
+    """
+    엔드포인트가 실제로 돌려주는 가장 큰 페이지 크기를 찾습니다.
+    후보 크기로 첫 페이지를 요청해, 정상 응답에 요청한 만큼(또는 전체 건수만큼) 항목이 오면 채택합니다.
+    (채택 크기, 채택된 첫 페이지 응답, 다른 연도에 재사용할 수 있는지, 버려진 네트워크 요청 수)를 반환합니다.
+    totalCount가 0이면 크기를 검증할 수 없으므로 이번 연도에만 쓰고 다른 연도에 재사용하지 않습니다.
+    """
+    rejected_requests = 0
+    for candidate in PAGE_SIZE_CANDIDATES:
+        probe_params = dict(params, numOfRows=candidate, pageNo=1)
+        used_network = cache_mode != 'replay'
+        try:
+            raw, validators, used_network = _fetch_page(
+                api_url, probe_params, endpoint, year, 1, candidate, cache_mode
+            )
+            if raw is None:
+                continue
+            items, total_count, _, ok = _parse_page(raw)
+        except (requests.exceptions.RequestException, ValueError, AttributeError):
+            # 서버가 거부하거나 JSON이 아닌 응답을 주면 다음(더 작은) 후보로 넘어갑니다.
+            if used_network:
+                rejected_requests += 1
+                if candidate != PAGE_SIZE_CANDIDATES[-1]:
+                    time.sleep(delay)
+            continue
+
+        if ok and total_count == 0:
+            return candidate, (raw, validators, used_network), False, rejected_requests
+        if ok and len(items) >= min(candidate, total_count):
+            return candidate, (raw, validators, used_network), True, rejected_requests
+
+        # 오류 응답이거나 요청보다 적게 왔으면 다음(더 작은) 후보로 넘어갑니다.
+        if used_network:
+            rejected_requests += 1
+            if candidate != PAGE_SIZE_CANDIDATES[-1]:
+                time.sleep(delay)
+
+    return DEFAULT_PAGE_SIZE, None, False, rejected_requests
+
+
+class ColumnBatches:
+    """페이지마다 받은 항목을 칼럼별 리스트로 모아 DataFrame 생성 비용을 줄입니다."""
+
+    def __init__(self):
+        self.columns = {}
+        self.num_rows = 0
+
+    def append_items(self, items):
+        """dict 리스트를 칼럼 배치로 변환하여 추가합니다."""
+        keys = dict.fromkeys(key for item in items for key in item)
+        self.append({key: [item.get(key) for item in items] for key in keys}, len(items))
+
+    def append(self, batch, num_rows):
+        """{칼럼명: 값 리스트} 형태의 배치를 추가합니다. 없는 칼럼은 None으로 채웁니다."""
+        for key in batch:
+            if key not in self.columns:
+                self.columns[key] = [None] * self.num_rows
+        for key, values in self.columns.items():
+            values.extend(batch.get(key, [None] * num_rows))
+        self.num_rows += num_rows
+
+    def to_frame(self):
+        return pd.DataFrame(self.columns)
+
+
+def collect_and_save_data(api_url, db_name, start_year, end_year, delay=1.0, cache_mode='use'):
     """
     지정된 기간 동안 API 데이터를 수집하여 사용자가 지정한 이름의 SQLite DB에 저장합니다.
+    각 페이지의 원본 응답은 api_cache에 압축 저장되며, cache_mode='replay'이면
+    네트워크 없이 캐시된 응답만으로 테이블을 다시 만듭니다.
     진행 로그를 문자열로 반환합니다.
     """
-    all_data = []
+    batches = ColumnBatches()
     log_messages = []
+
+    if cache_mode not in CACHE_MODES:
+        return f"오류: 알 수 없는 캐시 모드입니다: {cache_mode}"
     
     # 사용자가 입력한 DB 이름에 .db 확장자가 없으면 추가합니다.
     if not db_name.endswith('.db'):
@@ -21,77 +188,153 @@ def collect_and_save_data(api_url, db_name, start_year, end_year, delay=1.0):
 
     # 테이블 이름은 파일명에서 확장자를 제외한 부분으로 사용합니다.
     table_name = os.path.splitext(db_name)[0]
+    endpoint = api_cache.normalize_endpoint(api_url)
 
     # .env 파일에서 서비스 키를 가져옵니다.
     from dotenv import load_dotenv
     load_dotenv()
     service_key = os.getenv("SERVICE_KEY")
 
-    if not service_key or service_key == "YOUR_API_KEY_HERE":
+    # 캐시 재생 모드는 API를 호출하지 않으므로 서비스 키가 필요 없습니다.
+    if cache_mode != 'replay' and (not service_key or service_key == "YOUR_API_KEY_HERE"):
         return f"오류: .env 파일에 유효한 SERVICE_KEY가 설정되지 않았습니다."
 
     years_to_collect = list(range(start_year, end_year + 1))
+    network_pages = 0
+    cached_pages = 0
+    round_trips = 0
+    baseline_round_trips = 0
+    parse_times = []
+    probed_size = None
 
     for year in years_to_collect:
         log_messages.append(f"--- {year}년 데이터 수집 시작 ---")
         page_no = 1
-        num_of_rows = 100
+        year_rows = 0
+        params = {
+            'serviceKey': service_key,
+            'resultType': 'json',
+            'yr': year,
+        }
+
+        # 이전에 캐시된 페이지 크기가 있으면 같은 크기로 요청해야 캐시를 재사용할 수 있습니다.
+        cached_size = api_cache.cached_page_size(endpoint, year)
+        if cache_mode == 'replay' and cached_size is None:
+            log_messages.append(f"{year}년: 캐시된 응답이 없어 건너뜁니다.")
+            continue
+
+        first_page = None
+        # 이 연도에 실제로 서버에 보낸 요청 수와, 기존 방식이었다면 필요했을 요청 수
+        year_round_trips = 0
+        year_baseline = 0
+        if cached_size:
+            num_of_rows = cached_size
+        elif probed_size:
+            num_of_rows = probed_size
+        else:
+            num_of_rows, first_page, confirmed, rejected_requests = _probe_page_size(
+                api_url, params, endpoint, year, cache_mode, delay
+            )
+            # 채택되지 않은 탐색 요청도 실제 왕복이므로 요청 횟수에 포함합니다.
+            year_round_trips += rejected_requests
+            if confirmed:
+                probed_size = num_of_rows
+            log_messages.append(f"페이지 크기 탐색 결과: numOfRows={num_of_rows}")
 
         while True:
-            params = {
-                'serviceKey': service_key,
-                'resultType': 'json',
-                'numOfRows': num_of_rows,
-                'pageNo': page_no
-            }
-            params['yr'] = year
+            params['numOfRows'] = num_of_rows
+            params['pageNo'] = page_no
 
+            raw = None
             try:
-                response = requests.get(api_url, params=params)
-                response.raise_for_status()
-                data = response.json()
+                if first_page is not None:
+                    raw, validators, used_network = first_page
+                    first_page = None
+                else:
+                    raw, validators, used_network = _fetch_page(
+                        api_url, params, endpoint, year, page_no, num_of_rows, cache_mode
+                    )
+                if raw is None:
+                    log_messages.append(f"{year}년: {page_no} 페이지가 캐시에 없어 재생을 중단합니다.")
+                    break
 
-                body = data.get('response', {}).get('body', {})
-                if not body:
-                    body = data
+                parse_start = time.perf_counter()
+                items, total_count, body, ok = _parse_page(raw)
+                parse_ms = (time.perf_counter() - parse_start) * 1000
+                parse_times.append(parse_ms)
 
-                items = body.get('items', [])
-                total_count = int(body.get('totalCount', 0))
+                # 성공 코드와 totalCount가 있고 항목이 있는 응답만 캐시에 저장합니다.
+                # (일시적인 오류·빈 응답이 캐시되어 지난 연도가 계속 '데이터 없음'이 되지 않도록)
+                if validators is not None and ok and items:
+                    api_cache.store(endpoint, year, page_no, num_of_rows, raw, **validators)
+                # 캐시에서 읽은 페이지는 요청 횟수에 넣지 않습니다.
+                if used_network:
+                    network_pages += 1
+                    year_round_trips += 1
+                else:
+                    cached_pages += 1
+
+                if not ok:
+                    log_messages.append(f"{year}년: {page_no} 페이지 오류 응답. 서버 응답: {body}")
+                    break
+
+                if page_no == 1:
+                    # 기존 방식(100건씩, 빈 페이지가 나올 때까지 요청)의 요청 횟수
+                    year_baseline = math.ceil(total_count / DEFAULT_PAGE_SIZE) + 1
 
                 if page_no == 1 and total_count == 0:
                     log_messages.append(f"{year}년 데이터 없음 (totalCount: 0). 서버 응답: {body}")
                     break
 
-                if isinstance(items, dict) and 'item' in items:
-                    items = items.get('item', [])
-                
-                if isinstance(items, dict):
-                    items = [items]
-
                 if not items:
                     log_messages.append(f"{year}년 데이터 수집 완료.")
                     break
 
-                all_data.extend(items)
-                log_messages.append(f"{year}년: {page_no} 페이지 수집... (현재까지 총 {len(all_data)}건)")
-                
+                batches.append_items(items)
+                year_rows += len(items)
+                source = "네트워크" if used_network else "캐시"
+                log_messages.append(
+                    f"{year}년: {page_no} 페이지 수집 ({source}, 파싱 {parse_ms:.1f}ms)... "
+                    f"(현재까지 총 {batches.num_rows}건)"
+                )
+
+                # 전체 건수를 모두 받았으면 빈 페이지를 추가로 요청하지 않습니다.
+                if year_rows >= total_count:
+                    log_messages.append(f"{year}년 데이터 수집 완료.")
+                    break
+
                 page_no += 1
-                time.sleep(delay)
+                # 캐시에서 읽은 페이지는 서버에 부담을 주지 않으므로 대기하지 않습니다.
+                if used_network:
+                    time.sleep(delay)
             
-            except requests.exceptions.JSONDecodeError:
-                log_messages.append(f"JSON 디코딩 오류. 서버 원본 응답: {response.text}")
+            except json.JSONDecodeError:
+                text = raw.decode('utf-8', errors='replace') if raw else ''
+                log_messages.append(f"JSON 디코딩 오류. 서버 원본 응답: {text}")
                 break # 해당 연도는 중단
             except requests.exceptions.RequestException as e:
                 log_messages.append(f"요청 오류 발생: {e}")
                 break # 해당 연도는 중단
 
+        # 절약한 요청 수는 네트워크로 받은 연도끼리만 비교합니다.
+        if year_round_trips:
+            round_trips += year_round_trips
+            baseline_round_trips += year_baseline
+
+    log_messages.append(f"페이지 출처: 네트워크 {network_pages}건, 캐시 {cached_pages}건")
+    if round_trips:
+        log_messages.append(
+            f"요청 횟수: {round_trips}회 (100건 단위 대비 {max(baseline_round_trips - round_trips, 0)}회 절약)"
+        )
+    if parse_times:
+        log_messages.append(f"페이지당 평균 파싱 시간 {sum(parse_times) / len(parse_times):.1f}ms")
     final_log = "\n".join(log_messages)
 
-    if not all_data:
+    if not batches.num_rows:
         return f"수집된 데이터가 없습니다.\n\n--- 로그 ---\n{final_log}"
 
     try:
-        df = pd.DataFrame(all_data)
+        df = batches.to_frame()
         # 데이터 타입 자동 변환: 숫자 칼럼은 숫자로, 나머지는 문자로 처리
         for col in df.columns:
             df[col] = pd.to_numeric(df[col], errors='ignore')
@@ -99,12 +342,27 @@ def collect_and_save_data(api_url, db_name, start_year, end_year, delay=1.0):
         # 1. DB에 저장
         conn = sqlite3.connect(db_name)
         df.to_sql(table_name, conn, if_exists='replace', index=False)
+
+        # 2. 브랜드·연도별 파생 지표 계산 (필요한 칼럼이 있는 데이터셋만)
+        metrics_count = build_franchise_metrics(conn, table_name)
+        if metrics_count is not None:
+            log_messages.append(f"파생 지표 {metrics_count}건을 계산했습니다.")
+
+        # 3. 계층 필터 드롭다운 검색용 인덱스 생성 (숫자 칼럼 제외)
+        search_cols = [
+            col for col in detect_hierarchy_columns(df)
+            if not pd.api.types.is_numeric_dtype(df[col].dtype)
+        ]
+        search_count = build_search_index(conn, table_name, search_cols)
         conn.close()
+        if search_count is not None:
+            log_messages.append(f"필터 검색 인덱스에 {search_count}개 값을 등록했습니다.")
+        final_log = "\n".join(log_messages)
 
-        # 2. 엑셀 파일로 저장
+        # 4. 엑셀 파일로 저장
         excel_path = os.path.splitext(db_name)[0] + '.xlsx'
         df.to_excel(excel_path, index=False)
         
-        return f"성공! 총 {len(all_data)}건의 데이터를 '{db_name}' 및 '{excel_path}' 파일에 저장했습니다.\n\n--- 로그 ---\n{final_log}"
+        return f"성공! 총 {batches.num_rows}건의 데이터를 '{db_name}' 및 '{excel_path}' 파일에 저장했습니다.\n\n--- 로그 ---\n{final_log}"
     except Exception as e:
         return f"DB 또는 엑셀 저장 중 오류 발생: {e}\n\n--- 로그 ---\n{final_log}"
@@ -0,0 +1,97 @@
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from urllib.request import pathname2url
+
+import pandas as pd
+
+# 계층 필터로 사용할 최대 칼럼 수
+MAX_FILTER_LEVELS = 5
+
+# 한 연결에 동시에 ATTACH해 둘 최대 DB 수 (SQLite 기본 한도 10개보다 작게)
+MAX_ATTACHED_DATABASES = 8
+
+# 여러 DB를 비교 조회할 때 스레드마다 재사용하는 SQLite 연결
+_pool = threading.local()
+
+
+def table_name_for(db_file):
+    """DB 파일 경로에서 테이블 이름(파일명에서 확장자를 제외한 부분)을 구합니다."""
+    return os.path.splitext(os.path.basename(db_file))[0]
+
+
+def detect_hierarchy_columns(df):
+    """
+    앞쪽 칼럼부터 숫자가 아닌 칼럼('yr'은 예외)을 최대 5개까지 계층 필터 칼럼으로 고릅니다.
+    처음으로 숫자 칼럼이 나오면 멈춥니다.
+    """
+    h_cols = []
+    for col in df.columns:
+        is_numeric = pd.api.types.is_numeric_dtype(df[col].dtype)
+        if is_numeric and col != 'yr':
+            break
+        h_cols.append(col)
+        if len(h_cols) >= MAX_FILTER_LEVELS:
+            break
+    return h_cols
+
+
+def build_filter_clauses(h_cols, filter_values, alias=None):
+    """
+    계층 필터 선택값으로 WHERE 조건 목록과 파라미터 목록을 만듭니다.
+    alias를 주면 칼럼 앞에 테이블 별칭을 붙입니다.
+    """
+    where_clauses = []
+    params = []
+    if not h_cols:
+        return where_clauses, params
+
+    prefix = f'{alias}.' if alias else ''
+    for i, val_list in enumerate(filter_values):
+        if val_list and i < len(h_cols):
+            placeholders = ', '.join('?' for _ in val_list)
+            where_clauses.append(f'{prefix}"{h_cols[i]}" IN ({placeholders})')
+            params.extend(val_list)
+    return where_clauses, params
+
+
+def ensure_column_index(conn, table_name, col):
+    """칼럼에 인덱스가 없으면 만듭니다. 정렬·검색에서 같은 이름을 써서 인덱스가 중복되지 않도록 합니다."""
+    with conn:
+        conn.execute(f'CREATE INDEX IF NOT EXISTS "{table_name}_{col}_idx" ON "{table_name}" ("{col}")')
+
+
+def get_pooled_connection():
+    """현재 스레드의 비교 조회용 메모리 SQLite 연결을 반환합니다. 없으면 새로 만듭니다."""
+    conn = getattr(_pool, 'conn', None)
+    if conn is None:
+        # uri=True여야 ATTACH에서 읽기 전용(mode=ro) URI를 사용할 수 있습니다.
+        conn = sqlite3.connect(':memory:', uri=True)
+        _pool.conn = conn
+        _pool.attached = OrderedDict()
+        _pool.counter = 0
+    return conn
+
+
+def attach_database(db_file):
+    """
+    DB 파일을 풀 연결에 읽기 전용으로 ATTACH하고 스키마 별칭을 반환합니다.
+    이미 ATTACH된 파일은 그대로 재사용하고, 한도를 넘으면 가장 오래 쓰지 않은 DB를 DETACH합니다.
+    """
+    conn = get_pooled_connection()
+    path = os.path.abspath(db_file)
+    attached = _pool.attached
+    if path in attached:
+        attached.move_to_end(path)
+        return attached[path]
+
+    while len(attached) >= MAX_ATTACHED_DATABASES:
+        _, old_alias = attached.popitem(last=False)
+        conn.execute(f'DETACH DATABASE {old_alias}')
+
+    _pool.counter += 1
+    alias = f'ds{_pool.counter}'
+    conn.execute(f'ATTACH DATABASE ? AS {alias}', (f'file:{pathname2url(path)}?mode=ro',))
+    attached[path] = alias
+    return alias
@@ -0,0 +1,93 @@
+import os
+from collections import OrderedDict
+
+import pandas as pd
+
+# 고유값 비율이 이 값 이하인 문자열 칼럼은 범주형(category)으로 읽습니다.
+CATEGORY_MAX_RATIO = 0.5
+
+# 한 번에 읽어 변환할 행 수 (원본 object 배열이 한꺼번에 메모리에 올라가지 않도록)
+CHUNK_SIZE = 50000
+
+# 워커마다 보관할 최대 범주 사전 수 (필터 조합마다 쿼리 파라미터가 달라 키가 계속 늘어나므로)
+CATEGORY_CACHE_SIZE = 256
+
+# (DB 파일, 수정 시각, 쿼리, 파라미터, 칼럼) -> CategoricalDtype
+# 같은 워커에서 같은 데이터를 다시 읽으면 범주 사전을 새로 만들지 않고 공유합니다.
+# 가장 오래 쓰지 않은 항목부터 버리고, DB 파일이 다시 수집되면 이전 수정 시각의 항목은 바로 버립니다.
+_category_cache = OrderedDict()
+
+
+def _category_dtypes(conn, db_file, query, params, text_cols):
+    """고유값이 적은 문자열 칼럼의 범주 사전을 SQL로 구해 CategoricalDtype으로 만듭니다."""
+    mtime = os.path.getmtime(db_file)
+    key_base = (os.path.abspath(db_file), mtime, query, tuple(params))
+
+    dtypes = {}
+    missing = [col for col in text_cols if key_base + (col,) not in _category_cache]
+    if missing:
+        stale = [key for key in _category_cache if key[0] == key_base[0] and key[1] != mtime]
+        for key in stale:
+            del _category_cache[key]
+
+        counts_sql = ", ".join(f'COUNT(DISTINCT "{col}"), COUNT("{col}")' for col in missing)
+        counts = conn.execute(f'SELECT {counts_sql} FROM ({query})', params).fetchone()
+        for i, col in enumerate(missing):
+            n_distinct, n_values = counts[2 * i], counts[2 * i + 1]
+            dtype = None
+            if n_values and n_distinct / n_values <= CATEGORY_MAX_RATIO:
+                categories = [row[0] for row in conn.execute(
+                    f'SELECT DISTINCT "{col}" FROM ({query}) WHERE "{col}" IS NOT NULL ORDER BY "{col}"', params
+                )]
+                dtype = pd.CategoricalDtype(categories)
+            _category_cache[key_base + (col,)] = dtype
+
+    for col in text_cols:
+        _category_cache.move_to_end(key_base + (col,))
+        dtype = _category_cache[key_base + (col,)]
+        if dtype is not None:
+            dtypes[col] = dtype
+
+    while len(_category_cache) > CATEGORY_CACHE_SIZE:
+        _category_cache.popitem(last=False)
+    return dtypes
+
+
+def _downcast_numeric(df):
+    """
+    정수 칼럼을 값이 바뀌지 않는 가장 작은 정수 타입으로 줄입니다.
+    실수 칼럼은 float32로 줄이면 차트의 합계·평균이 float32로 계산되어 값이 틀어지므로 float64로 둡니다.
+    (정수는 pandas가 집계할 때 int64로 올려 계산합니다.)
+    """
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_integer_dtype(series.dtype):
+            df[col] = pd.to_numeric(series, downcast='integer')
+    return df
+
+
+def load_compact_frame(conn, db_file, query, params=None):
+    """
+    쿼리 결과를 메모리를 적게 쓰는 DataFrame으로 읽습니다.
+    고유값이 적은 문자열 칼럼은 모든 청크가 같은 범주 사전을 쓰는 category로,
+    정수 칼럼은 값이 바뀌지 않는 더 작은 정수 타입으로 바꿉니다.
+    (DataFrame, 변환 전 메모리 bytes, 변환 후 메모리 bytes)를 반환합니다.
+    """
+    params = list(params or [])
+    chunks = []
+    before_bytes = 0
+    dtypes = None
+    for chunk in pd.read_sql_query(query, conn, params=params, chunksize=CHUNK_SIZE):
+        before_bytes += int(chunk.memory_usage(deep=True).sum())
+        if dtypes is None:
+            text_cols = [col for col in chunk.columns if chunk[col].dtype == object]
+            dtypes = _category_dtypes(conn, db_file, query, params, text_cols)
+        chunks.append(chunk.astype(dtypes) if dtypes else chunk)
+
+    if not chunks:
+        return pd.read_sql_query(query, conn, params=params), 0, 0
+
+    # 범주 사전이 같으므로 이어 붙여도 category 타입이 유지됩니다.
+    df = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+    df = _downcast_numeric(df)
+    return df, before_bytes, int(df.memory_usage(deep=True).sum())
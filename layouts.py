@@ -1,5 +1,6 @@
-from dash import dcc, html
+from dash import dcc, html, dash_table
 import dash_bootstrap_components as dbc
+from data_browser import PAGE_SIZE
 
 def create_config_tab():
     """'DB 구성' 탭의 레이아웃을 생성합니다."""
@@ -28,6 +29,20 @@ def create_config_tab():
                     )
                 ])
             ], className="mb-3"),
+            dbc.Row([
+                dbc.Col([
+                    dbc.Label("API 응답 캐시:", html_for="cache-mode-input"),
+                    dbc.RadioItems(
+                        id='cache-mode-input',
+                        options=[
+                            {'label': '캐시 사용 (지난 연도는 캐시, 올해만 재확인)', 'value': 'use'},
+                            {'label': '전체 재확인 (변경된 페이지만 다시 받기)', 'value': 'refresh'},
+                            {'label': '오프라인 재생 (캐시로만 DB 재생성)', 'value': 'replay'},
+                        ],
+                        value='use'
+                    )
+                ])
+            ], className="mb-3"),
             dbc.Button('데이터 수집 시작', id='start-collection-button', n_clicks=0, color="primary"),
             html.Hr(),
             # 진행률 표시 바 (이제 사용하지 않음)
@@ -66,6 +81,10 @@ def create_visualize_tab():
                         
                                             dbc.Label("2. 데이터 필터링 (선택 사항)"),
                                             dcc.Store(id='h-filter-cols'),
+                                            # 연계 필터를 브라우저에서 계산하기 위한 필터 조합 (사전 인코딩)
+                                            dcc.Store(id='h-filter-hierarchy'),
+                                            # 조합이 많아 서버 측 검색이 필요할 때 브라우저가 남기는 요청
+                                            *[dcc.Store(id=f'h-filter-request-{i}') for i in range(5)],
                                             html.Div(id='h-filter-container-0'),
                                             html.Div(id='h-filter-container-1'),
                                             html.Div(id='h-filter-container-2'),
@@ -100,6 +119,19 @@ def create_visualize_tab():
                             html.Br(),
                             dbc.Label("상위 N개만 보기 (선택 사항)"),
                             dcc.Input(id='chart-builder-top-n', type='number', placeholder='예: 10', min=1, step=1, className="w-100"),
+                            html.Br(),
+                            html.Br(),
+                            dbc.Label("비교할 데이터셋 (선택 사항)"),
+                            dcc.Dropdown(id='compare-dataset-dropdown', multi=True, placeholder='함께 비교할 DB 파일...'),
+                            dbc.RadioItems(
+                                id='compare-mode',
+                                options=[
+                                    {'label': '합치기 (데이터셋별 비교)', 'value': 'union'},
+                                    {'label': '조인 (브랜드명·연도 기준)', 'value': 'join'},
+                                ],
+                                value='union',
+                                className="mt-1"
+                            ),
                                                 ])
                                             ], className="mb-3"),
                         
@@ -109,16 +141,37 @@ def create_visualize_tab():
                 width=3 # 전체 12칸 중 3칸을 차지
             ),
             
-            # 2. 그래프 표시 영역
+            # 2. 그래프 / 데이터 탐색 표시 영역
             dbc.Col(
                 dbc.Card(
                     dbc.CardBody([
-                        # 그래프가 여기에 표시됩니다.
-                        dcc.Loading(
-                            id="loading-graph",
-                            type="default",
-                            children=dcc.Graph(id='visualization-graph')
-                        )
+                        dbc.Tabs(id='view-tabs', active_tab='view-graph', children=[
+                            dbc.Tab(label='그래프', tab_id='view-graph', children=[
+                                # 그래프가 여기에 표시됩니다.
+                                dcc.Loading(
+                                    id="loading-graph",
+                                    type="default",
+                                    children=dcc.Graph(id='visualization-graph')
+                                )
+                            ]),
+                            dbc.Tab(label='데이터 탐색', tab_id='view-browse', children=[
+                                # 페이지 이동·정렬·필터링은 모두 서버의 SQL에서 처리됩니다.
+                                html.Div(id='data-browser-info', className="mt-2 mb-2"),
+                                dcc.Store(id='data-browser-state'),
+                                dash_table.DataTable(
+                                    id='data-browser-table',
+                                    page_current=0,
+                                    page_size=PAGE_SIZE,
+                                    page_action='custom',
+                                    sort_action='custom',
+                                    sort_mode='single',
+                                    sort_by=[],
+                                    filter_action='custom',
+                                    filter_query='',
+                                    style_table={'overflowX': 'auto'},
+                                )
+                            ]),
+                        ])
                     ])
                 ),
                 width=9 # 전체 12칸 중 9칸을 차지
@@ -0,0 +1,199 @@
+import sqlite3
+import unicodedata
+
+from db_utils import build_filter_clauses, ensure_column_index
+
+# 검색 한 번에 드롭다운으로 보내는 최대 항목 수
+SEARCH_RESULT_LIMIT = 50
+
+# 계층 필터 조합 수가 이 값 이하이면 조합 전체를 브라우저로 보내 연계 필터를 브라우저에서 계산합니다.
+# 더 많으면 초기 전송량을 줄이기 위해 서버 측 검색을 사용합니다.
+CLIENTSIDE_MAX_COMBINATIONS = 20000
+
+# trigram 토크나이저가 LIKE 패턴을 인덱스로 처리할 수 있는 최소 글자 수
+TRIGRAM_MIN_LENGTH = 3
+
+# 한글 음절의 초성 순서 (호환용 자모)
+CHOSEONG = 'ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ'
+
+# 조합형 자모(초성·중성·종성)를 위치 구분이 없는 호환용 자모로 바꾸는 표
+# 입력 중인 '돗'(ㄷㅗ + 종성ㅅ)이 '도시락'(ㄷㅗ + 초성ㅅ ㅣ ...)과 일치하도록 하기 위함입니다.
+_COMPAT_BY_NAME = {}
+for _code in range(0x3131, 0x318F):
+    _name = unicodedata.name(chr(_code), '')
+    if _name.startswith('HANGUL LETTER '):
+        _COMPAT_BY_NAME.setdefault(_name[len('HANGUL LETTER '):], chr(_code))
+
+_JAMO_TO_COMPAT = {}
+for _code in range(0x1100, 0x1200):
+    _parts = unicodedata.name(chr(_code), '').split(' ', 2)
+    if len(_parts) == 3 and _parts[2] in _COMPAT_BY_NAME:
+        _JAMO_TO_COMPAT[chr(_code)] = _COMPAT_BY_NAME[_parts[2]]
+
+
+# 겹받침·이중모음은 자판에서 두 번 입력하므로 낱자로 나눕니다.
+# 입력 중인 '닭'(ㄷㅏ + ㄺ)이 다음 글자를 치면 '달기'(ㄷㅏㄹ ㄱㅣ)가 되어도 계속 일치하도록 하기 위함입니다.
+_SPLIT_COMPOUND = str.maketrans({
+    'ㄳ': 'ㄱㅅ', 'ㄵ': 'ㄴㅈ', 'ㄶ': 'ㄴㅎ', 'ㄺ': 'ㄹㄱ', 'ㄻ': 'ㄹㅁ', 'ㄼ': 'ㄹㅂ',
+    'ㄽ': 'ㄹㅅ', 'ㄾ': 'ㄹㅌ', 'ㄿ': 'ㄹㅍ', 'ㅀ': 'ㄹㅎ', 'ㅄ': 'ㅂㅅ',
+    'ㅘ': 'ㅗㅏ', 'ㅙ': 'ㅗㅐ', 'ㅚ': 'ㅗㅣ', 'ㅝ': 'ㅜㅓ', 'ㅞ': 'ㅜㅔ', 'ㅟ': 'ㅜㅣ', 'ㅢ': 'ㅡㅣ',
+})
+
+
+def search_table_name(table_name):
+    """원본 테이블에 대응하는 검색 인덱스(FTS5) 테이블 이름을 반환합니다."""
+    return f"{table_name}_search"
+
+
+def search_columns_table_name(table_name):
+    """검색 인덱스에 색인한 칼럼 목록을 기록하는 테이블 이름을 반환합니다."""
+    return f"{table_name}_search_columns"
+
+
+def to_jamo(text):
+    """문자열을 자모 단위로 풀어 씁니다. 예: '본도시락' -> 'ㅂㅗㄴㄷㅗㅅㅣㄹㅏㄱ', '닭' -> 'ㄷㅏㄹㄱ'"""
+    decomposed = unicodedata.normalize('NFD', str(text).lower())
+    return ''.join(_JAMO_TO_COMPAT.get(ch, ch) for ch in decomposed).translate(_SPLIT_COMPOUND)
+
+
+def to_chosung(text):
+    """한글 음절을 초성으로 바꿉니다. 예: '본도시락' -> 'ㅂㄷㅅㄹ'"""
+    result = []
+    for ch in str(text).lower():
+        code = ord(ch) - 0xAC00
+        result.append(CHOSEONG[code // 588] if 0 <= code < 11172 else ch)
+    return ''.join(result)
+
+
+def _is_chosung_query(text):
+    stripped = text.replace(' ', '')
+    return bool(stripped) and all(ch in CHOSEONG for ch in stripped)
+
+
+def _escape_like(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def build_search_index(conn, table_name, columns):
+    """
+    계층 필터용 범주형 칼럼의 고유값으로 FTS5(trigram) 검색 인덱스를 만듭니다.
+    자모 분해 문자열과 초성 문자열을 함께 색인하여 한글 부분 입력과 초성 검색을 지원합니다.
+    원본 테이블의 각 칼럼에도 일반 인덱스를 만듭니다.
+    색인한 고유값 수를 반환하며, FTS5를 지원하지 않는 SQLite이면 None을 반환합니다.
+    """
+    search_table = search_table_name(table_name)
+    columns_table = search_columns_table_name(table_name)
+    try:
+        with conn:
+            conn.execute(f'DROP TABLE IF EXISTS "{columns_table}"')
+            conn.execute(f'DROP TABLE IF EXISTS "{search_table}"')
+            conn.execute(
+                f'CREATE VIRTUAL TABLE "{search_table}" '
+                f"USING fts5(col UNINDEXED, value UNINDEXED, jamo, chosung, tokenize='trigram')"
+            )
+    except sqlite3.OperationalError:
+        return None
+
+    # 검색 결과를 원본 테이블에서 찾는 IN (...) 조건과 정렬이 인덱스를 타도록 합니다.
+    for col in columns:
+        ensure_column_index(conn, table_name, col)
+
+    count = 0
+    with conn:
+        for col in columns:
+            values = conn.execute(
+                f'SELECT DISTINCT "{col}" FROM "{table_name}" WHERE "{col}" IS NOT NULL'
+            ).fetchall()
+            rows = [(col, str(v), to_jamo(v), to_chosung(v)) for (v,) in values]
+            conn.executemany(
+                f'INSERT INTO "{search_table}" (col, value, jamo, chosung) VALUES (?, ?, ?, ?)', rows
+            )
+            count += len(rows)
+
+        # 검색할 때마다 FTS 테이블을 훑지 않도록 색인한 칼럼을 따로 기록합니다.
+        conn.execute(f'CREATE TABLE "{columns_table}" (col TEXT PRIMARY KEY)')
+        conn.executemany(f'INSERT INTO "{columns_table}" (col) VALUES (?)', [(col,) for col in columns])
+    return count
+
+
+def _indexed_columns(conn, table_name):
+    """검색 인덱스에 색인된 칼럼 목록을 반환합니다. 인덱스가 없으면 빈 집합입니다."""
+    columns_table = search_columns_table_name(table_name)
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (columns_table,)
+    ).fetchone()
+    if not row:
+        return set()
+    return {r[0] for r in conn.execute(f'SELECT col FROM "{columns_table}"')}
+
+
+def search_options(conn, table_name, h_cols, level, parent_values, search_value,
+                   limit=SEARCH_RESULT_LIMIT):
+    """
+    level번째 계층 칼럼에서 상위 필터 조건을 만족하고 검색어와 일치하는 값을 최대 limit개 반환합니다.
+    검색 인덱스가 있으면 자모·초성 기준으로, 없으면 원본 테이블에서 LIKE로 찾습니다.
+    """
+    col = h_cols[level]
+    where_clauses, params = build_filter_clauses(h_cols, parent_values)
+
+    search_value = (search_value or '').strip()
+    if search_value:
+        if col in _indexed_columns(conn, table_name):
+            key, field = (search_value, 'chosung') if _is_chosung_query(search_value) else (to_jamo(search_value), 'jamo')
+            search_sql = f'SELECT value FROM "{search_table_name(table_name)}" WHERE col = ? AND {field} LIKE ?'
+            stripped = key.replace('%', '').replace('_', '')
+            if len(stripped) >= TRIGRAM_MIN_LENGTH:
+                # trigram 토크나이저는 ESCAPE 없는 3글자 이상 LIKE 패턴만 인덱스로 처리하므로,
+                # 와일드카드 문자(%, _)는 검색어에서 빼고 ESCAPE 없이 찾습니다.
+                where_clauses.append(f'"{col}" IN ({search_sql})')
+                params.extend([col, f'%{stripped}%'])
+            else:
+                # 3글자보다 짧은 패턴은 인덱스로 처리하면 결과가 비므로, ESCAPE를 붙여 한 행씩 비교하게 합니다.
+                where_clauses.append(f'"{col}" IN ({search_sql} ESCAPE \'\\\')')
+                params.extend([col, f'%{_escape_like(key)}%'])
+        else:
+            where_clauses.append(f'"{col}" LIKE ? ESCAPE \'\\\'')
+            params.append(f'%{_escape_like(search_value)}%')
+
+    order = 'DESC' if col == 'yr' else 'ASC'
+    query = f'SELECT DISTINCT "{col}" FROM "{table_name}" WHERE "{col}" IS NOT NULL'
+    if where_clauses:
+        query += " AND " + " AND ".join(where_clauses)
+    query += f' ORDER BY "{col}" {order} LIMIT ?'
+    return [row[0] for row in conn.execute(query, params + [limit])]
+
+
+def encode_filter_hierarchy(conn, table_name, h_cols, max_combinations=CLIENTSIDE_MAX_COMBINATIONS):
+    """
+    계층 필터 칼럼 값의 고유 조합을 사전 인코딩하여 브라우저로 보낼 형태로 만듭니다.
+    칼럼마다 정렬된 값 사전(dicts)과, 조합별 사전 번호 배열(codes, 칼럼 단위, 값이 없으면 -1)을 담고,
+    브라우저에서 같은 방식으로 검색할 수 있도록 사전 값의 자모·초성 문자열도 함께 담습니다.
+    조합 수가 max_combinations를 넘으면 None을 반환합니다.
+    """
+    col_list = ", ".join(f'"{col}"' for col in h_cols)
+    count = conn.execute(
+        f'SELECT COUNT(*) FROM (SELECT DISTINCT {col_list} FROM "{table_name}")'
+    ).fetchone()[0]
+    if count > max_combinations:
+        return None
+
+    rows = conn.execute(f'SELECT DISTINCT {col_list} FROM "{table_name}"').fetchall()
+    dicts = []
+    codes = []
+    for i, col in enumerate(h_cols):
+        # 서버 측 검색과 같은 순서(연도는 내림차순)로 사전을 만듭니다.
+        order = 'DESC' if col == 'yr' else 'ASC'
+        values = [row[0] for row in conn.execute(
+            f'SELECT DISTINCT "{col}" FROM "{table_name}" WHERE "{col}" IS NOT NULL ORDER BY "{col}" {order}'
+        )]
+        index = {value: code for code, value in enumerate(values)}
+        dicts.append(values)
+        codes.append([index.get(row[i], -1) for row in rows])
+
+    return {
+        'dicts': dicts,
+        'codes': codes,
+        'jamo': [[to_jamo(v) for v in values] for values in dicts],
+        'chosung': [[to_chosung(v) for v in values] for values in dicts],
+        'limit': SEARCH_RESULT_LIMIT,
+    }
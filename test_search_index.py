@@ -0,0 +1,49 @@
+import sqlite3
+
+import pytest
+
+from search_index import build_search_index, search_options
+
+H_COLS = ['brandNm', 'indutyMlsfcNm']
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE "brands" ("brandNm" TEXT, "indutyMlsfcNm" TEXT, "yr" INTEGER)')
+    conn.executemany('INSERT INTO "brands" VALUES (?, ?, ?)', [
+        ('본도시락', '한식', 2023),
+        ('과일가게', '기타 외식', 2023),
+        ('닭갈비집', '한식', 2022),
+        ('50%_할인마트', '편의점', 2023),
+    ])
+    if build_search_index(conn, 'brands', H_COLS) is None:
+        pytest.skip('FTS5를 지원하지 않는 SQLite입니다.')
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize('search_value, expected', [
+    # 1글자 (자모 2개 / 초성 1개)
+    ('고', ['과일가게']),
+    ('ㅅ', ['본도시락']),
+    # 2글자 (초성 2개)
+    ('ㅂㄷ', ['본도시락']),
+    ('ㄷㄱ', ['닭갈비집']),
+    # 3글자 이상 (trigram 인덱스 사용)
+    ('도시락', ['본도시락']),
+    ('닭갈', ['닭갈비집']),
+    ('ㅂㄷㅅ', ['본도시락']),
+])
+def test_search_options_matches_short_and_long_keys(conn, search_value, expected):
+    assert search_options(conn, 'brands', H_COLS, 0, [], search_value) == expected
+
+
+def test_search_options_treats_wildcards_literally_in_short_keys(conn):
+    assert search_options(conn, 'brands', H_COLS, 0, [], '%') == ['50%_할인마트']
+    assert search_options(conn, 'brands', H_COLS, 0, [], '_') == ['50%_할인마트']
+
+
+def test_search_options_applies_parent_filters(conn):
+    assert search_options(conn, 'brands', H_COLS, 1, [['본도시락']], 'ㅎ') == ['한식']
+    assert search_options(conn, 'brands', H_COLS, 1, [['본도시락']], '외식') == []